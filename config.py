@@ -6,6 +6,7 @@ and settings that can be customized for different environments.
 """
 
 import logging
+import os
 from typing import Dict
 
 
@@ -18,14 +19,31 @@ class Config:
     VERSION = "1.0.0"
     
     # Server Configuration
+    APP_ENV = os.getenv("APP_ENV", "production")
     HOST = "0.0.0.0"
     PORT = 8000
-    RELOAD = True
+    RELOAD = APP_ENV == "dev"
+    # Hazard zones and cached routes live in process memory, so more than one
+    # worker only makes sense once StorageService is backed by a shared store
+    WORKERS = 1 if RELOAD else int(os.getenv("WORKERS", "1"))
+    # "auto" picks uvloop and httptools when installed (not available on Windows)
+    LOOP = "auto"
+    HTTP = "auto"
     
     # Routing Configuration
     DEFAULT_LOCATION = "Chiang Mai, Thailand"
     DEFAULT_NETWORK_TYPE = "drive"
     DEFAULT_DANGER_THRESHOLD = 3
+    # Dijkstra first searches up to this multiple of the straight-line distance
+    # and only explores the whole graph if the end is not reached
+    ROUTE_SEARCH_LIMIT_FACTOR = 2.0
+    
+    # Cache Configuration (per worker)
+    GRAPH_CACHE_SIZE = 8  # OSM graphs, tens of MB each
+    SAFE_GRAPH_CACHE_SIZE = 16  # hazard configurations per cached graph
+    ROUTE_CACHE_SIZE = 1000  # calculated routes and their maps
+    ROUTE_CACHE_TTL = 3600  # seconds
+    MAP_CACHE_SIZE = 256  # rendered map pages, shared by identical routes
     
     # Speed estimates for duration calculation (km/h)
     SPEED_ESTIMATES: Dict[str, float] = {
@@ -33,6 +51,10 @@ class Config:
         "walk": 5.0,
         "bike": 15.0
     }
+    # Minutes per meter for each network type, folded once at import
+    MIN_PER_METER: Dict[str, float] = {
+        k: 60.0 / (v * 1000.0) for k, v in SPEED_ESTIMATES.items()
+    }
     
     # Map Configuration
     DEFAULT_ZOOM_LEVEL = 14
@@ -51,6 +73,8 @@ class Config:
 
 def setup_logging():
     """Configure application logging."""
+    # Log records don't need caller file/line info, skip the frame lookup
+    logging._srcfile = None
     logging.basicConfig(
         level=Config.LOG_LEVEL,
         format=Config.LOG_FORMAT
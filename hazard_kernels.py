@@ -0,0 +1,66 @@
+"""
+Numba-compiled distance kernels for hazard-aware routing.
+
+This module contains the arithmetic hot paths of route calculation:
+the edge-versus-hazard distance check.
+"""
+
+import math
+import numpy as np
+from numba import njit
+
+EARTH_RADIUS_M = 6371000.0
+
+
+@njit(cache=True, inline='always')
+def _haversine_m(lat1, lon1, cos_lat1, lat2, lon2, cos_lat2):
+    """Haversine distance in meters between two points in radians, given their latitude cosines."""
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + cos_lat1 * cos_lat2 * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+@njit(cache=True)
+def edge_max_hazard_levels(u_lat, u_lon, u_cos, v_lat, v_lon, v_cos, m_lat, m_lon, m_cos,
+                           hz_lat, hz_lon, hz_cos, hz_radius, hz_level, hz_bounds):
+    """Highest level of the hazards covering each edge's endpoints or midpoint, 0 if none.
+
+    Coordinates are in radians, each with its precomputed latitude cosine,
+    and hazard radii are in meters. ``hz_bounds`` holds each hazard circle's
+    (min_lat, min_lon, max_lat, max_lon) box in radians.
+    """
+    levels = np.zeros(u_lat.shape[0], dtype=np.int64)
+    # Highest level first, so the first covering hazard settles the edge
+    order = np.argsort(hz_level)[::-1]
+
+    for i in range(u_lat.shape[0]):
+        lat_lo, lat_hi = min(u_lat[i], v_lat[i]), max(u_lat[i], v_lat[i])
+        lon_lo, lon_hi = min(u_lon[i], v_lon[i]), max(u_lon[i], v_lon[i])
+        for j in order:
+            # An edge whose box misses the hazard's box has no point inside the circle
+            if (lat_hi < hz_bounds[j, 0] or lon_hi < hz_bounds[j, 1]
+                    or lat_lo > hz_bounds[j, 2] or lon_lo > hz_bounds[j, 3]):
+                continue
+
+            distance = min(
+                _haversine_m(hz_lat[j], hz_lon[j], hz_cos[j], u_lat[i], u_lon[i], u_cos[i]),
+                _haversine_m(hz_lat[j], hz_lon[j], hz_cos[j], v_lat[i], v_lon[i], v_cos[i]),
+                _haversine_m(hz_lat[j], hz_lon[j], hz_cos[j], m_lat[i], m_lon[i], m_cos[i])
+            )
+            if distance <= hz_radius[j]:
+                levels[i] = hz_level[j]
+                break
+
+    return levels
+
+
+def warm_up() -> None:
+    """Compile the kernels ahead of the first request."""
+    coords = np.zeros(1, dtype=np.float64)
+    radius = np.ones(1, dtype=np.float64)
+    level = np.ones(1, dtype=np.int64)
+    bounds = np.zeros((1, 4), dtype=np.float64)
+    edge_max_hazard_levels(coords, coords, coords, coords, coords, coords,
+                           coords, coords, coords, coords, coords, coords, radius, level, bounds)
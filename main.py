@@ -13,10 +13,11 @@ uvicorn main:app --reload --host 0.0.0.0 --port 8000
 """
 
 from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 import logging
 
 from config import Config, setup_logging, API_DOCS_HTML
+import hazard_kernels
 from storage_service import storage_service
 from routes import health, hazards, routing
 
@@ -28,7 +29,16 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title=Config.TITLE,
     description=Config.DESCRIPTION,
-    version=Config.VERSION
+    version=Config.VERSION,
+    default_response_class=ORJSONResponse
+)
+
+# Docs page is static, so encode it and build its response once
+_DOCS_BYTES = API_DOCS_HTML.encode("utf-8")
+_DOCS_RESPONSE = Response(
+    content=_DOCS_BYTES,
+    media_type="text/html",
+    headers={"cache-control": "public, max-age=3600"}
 )
 
 # Include routers
@@ -40,15 +50,17 @@ app.include_router(routing.router)
 @app.get("/", response_class=HTMLResponse)
 async def root():
     """API documentation and test interface."""
-    return HTMLResponse(content=API_DOCS_HTML)
+    return _DOCS_RESPONSE
 
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize API with default hazard zones."""
+    hazard_kernels.warm_up()
     storage_service.initialize_default_hazards()
-    hazard_count = len(storage_service.get_all_hazards())
-    logger.info(f"Initialized with {hazard_count} default hazard zones")
+    if logger.isEnabledFor(logging.INFO):
+        hazard_count = len(storage_service.get_hazard_arrays())
+        logger.info("Initialized with %d default hazard zones", hazard_count)
 
 
 if __name__ == "__main__":
@@ -57,5 +69,8 @@ if __name__ == "__main__":
         "main:app", 
         host=Config.HOST, 
         port=Config.PORT, 
-        reload=Config.RELOAD
+        reload=Config.RELOAD,
+        workers=Config.WORKERS,
+        loop=Config.LOOP,
+        http=Config.HTTP
     )
\ No newline at end of file
@@ -1,83 +1,101 @@
 """
 Map visualization service for generating interactive HTML maps.
 
-This module handles the creation of Folium maps with routes,
-hazard zones, and interactive markers.
+This module renders routes, hazard zones, and start/end markers
+into a static Leaflet page template.
 """
 
-from typing import List
-import folium
+from pathlib import Path
+from typing import List, Dict, Any
+import hashlib
+import threading
+import orjson
+from cachetools import LRUCache
 
-from models import Coordinate, HazardZone
+from config import Config
+from models import Coordinate
+from storage_service import HazardArrays
+
+# Leaflet page shell, loaded once; only the JSON data changes per map
+_TEMPLATE = (Path(__file__).parent / "map_template.html").read_text(encoding="utf-8")
+
+
+def _to_js(data) -> str:
+    """Serialize data as JSON that is safe to embed in a <script> block."""
+    return orjson.dumps(data).decode("utf-8").replace("<", "\\u003c")
+
+
+def _hazards_digest(hazards: HazardArrays) -> bytes:
+    """Digest of everything about a hazard set that appears on a map."""
+    digest = hashlib.blake2b(digest_size=16)
+    for column in (hazards.lat, hazards.lon, hazards.level, hazards.radius):
+        digest.update(column.tobytes())
+    digest.update(orjson.dumps(hazards.names))
+    return digest.digest()
 
 
 class MapService:
     """Service class for map generation and visualization."""
     
+    def __init__(self):
+        # Rendered pages keyed by route shape, shared by routes that come out identical
+        self.map_cache: LRUCache = LRUCache(maxsize=Config.MAP_CACHE_SIZE)
+        # Maps are rendered in worker threads; cachetools caches are not thread-safe
+        self._cache_lock = threading.Lock()
+    
+    def get_route_map_bytes(self, route_data: Dict[str, Any]) -> bytes:
+        """Get the UTF-8 map page for cached route data, rendering it on first request."""
+        start, end, hazards = route_data["start"], route_data["end"], route_data["hazards"]
+        cache_key = (
+            route_data["graph_key"], tuple(route_data["route"]),
+            start.lat, start.lon, end.lat, end.lon,
+            _hazards_digest(hazards)
+        )
+        
+        with self._cache_lock:
+            map_bytes = self.map_cache.get(cache_key)
+        if map_bytes is not None:
+            return map_bytes
+        
+        map_bytes = self.create_route_map(
+            route_data["route_coords"], start, end, hazards
+        ).encode("utf-8")
+        with self._cache_lock:
+            self.map_cache[cache_key] = map_bytes
+        
+        return map_bytes
+    
     @staticmethod
     def create_route_map(
-        original_graph, 
-        route: List, 
+        route_coords: List[List[float]], 
         start_coord: Coordinate, 
         end_coord: Coordinate, 
-        hazards: List[HazardZone]
+        hazards: HazardArrays
     ) -> str:
         """Generate interactive HTML map with route and hazards."""
-        m = folium.Map(location=[start_coord.lat, start_coord.lon], zoom_start=14)
-        
-        # Add route
-        if route:
-            route_coords = [
-                (original_graph.nodes[node]['y'], original_graph.nodes[node]['x']) 
-                for node in route
-            ]
-            folium.PolyLine(
-                locations=route_coords,
-                color='blue',
-                weight=5,
-                opacity=0.8,
-                popup=f"Safe Route ({len(route)} waypoints)"
-            ).add_to(m)
-        
-        # Add start marker
-        folium.Marker(
-            [start_coord.lat, start_coord.lon],
-            popup="🟢 START",
-            icon=folium.Icon(color='green', icon='play')
-        ).add_to(m)
-        
-        # Add end marker
-        folium.Marker(
-            [end_coord.lat, end_coord.lon],
-            popup="🔴 END",
-            icon=folium.Icon(color='red', icon='stop')
-        ).add_to(m)
-        
-        # Add hazard zones
-        for hazard in hazards:
-            color = MapService._get_hazard_color(hazard.level)
-            
-            # Add hazard circle
-            folium.Circle(
-                location=(hazard.lat, hazard.lon),
-                radius=hazard.radius_m,
-                color=color,
-                fill=True,
-                fill_color=color,
-                fill_opacity=0.4,
-                popup=f"<b>{hazard.name}</b><br>Level: {hazard.level}<br>Radius: {hazard.radius_m}m"
-            ).add_to(m)
-            
-            # Add hazard center marker
-            folium.CircleMarker(
-                location=(hazard.lat, hazard.lon),
-                radius=6,
-                color='black',
-                fill=True,
-                popup=hazard.name
-            ).add_to(m)
+        hazard_dicts = [
+            {
+                "lat": lat,
+                "lon": lon,
+                "level": level,
+                "radius_m": radius_m,
+                "name": name if name is not None else "",
+                "color": MapService._get_hazard_color(level)
+            }
+            for lat, lon, level, radius_m, name in zip(
+                hazards.lat.tolist(), hazards.lon.tolist(), hazards.level.tolist(),
+                hazards.radius.tolist(), hazards.names
+            )
+        ]
         
-        return m._repr_html_()
+        return (
+            _TEMPLATE
+            .replace("{ROUTE_JSON}", _to_js(route_coords))
+            .replace("{HAZARDS_JSON}", _to_js(hazard_dicts))
+            .replace("{START_JSON}", _to_js([start_coord.lat, start_coord.lon]))
+            .replace("{END_JSON}", _to_js([end_coord.lat, end_coord.lon]))
+            .replace("{ZOOM}", str(Config.DEFAULT_ZOOM_LEVEL))
+        )
     
     @staticmethod
     def _get_hazard_color(level: int) -> str:
@@ -25,7 +25,7 @@ async def get_hazards():
 async def add_hazard(hazard: HazardZone):
     """Add a new hazard zone."""
     result = storage_service.add_hazard(hazard)
-    logger.info(f"Added hazard zone: {result.name} (Level {result.level})")
+    logger.info("Added hazard zone: %s (Level %d)", result.name, result.level)
     return result
 
 
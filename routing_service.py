@@ -2,162 +2,348 @@
 Core routing service for hazard-aware path calculation.
 
 This module handles OSM graph loading, hazard zone processing,
-and safe route calculation using A* algorithm.
+and safe route calculation using Dijkstra's algorithm.
 """
 
 from typing import List, Tuple, Dict, Any
+import hashlib
+import math
+import threading
+import numpy as np
+from cachetools import LRUCache
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+import shapely
 import osmnx as ox
-import networkx as nx
-from geopy.distance import geodesic
 from fastapi import HTTPException
 import logging
 
-from models import Coordinate, HazardZone
+from config import Config
+from hazard_kernels import EARTH_RADIUS_M, edge_max_hazard_levels
+from models import Coordinate
+from storage_service import HazardArrays
 
 logger = logging.getLogger(__name__)
 
 
+def _unit_vectors(lat, lon) -> np.ndarray:
+    """Points on the unit sphere; chord order matches great-circle distance order."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _radius_bounds(lat: np.ndarray, lon: np.ndarray, radius_m: np.ndarray):
+    """Bounding boxes (min_lon, min_lat, max_lon, max_lat) of circles on the sphere."""
+    angle = radius_m / EARTH_RADIUS_M
+    dlat = np.degrees(angle)
+    cos_lat = np.cos(np.radians(lat))
+    sin_angle = np.sin(angle)
+    # Circles that reach a pole wrap around every longitude
+    wraps = cos_lat <= sin_angle
+    dlon = np.where(
+        wraps, 180.0,
+        np.degrees(np.arcsin(sin_angle / np.where(wraps, 1.0, cos_lat)))
+    )
+    return lon - dlon, lat - dlat, lon + dlon, lat + dlat
+
+
+def _hazard_signature(hazards: HazardArrays) -> bytes:
+    """Stable, order-independent digest of a set of blocking hazards."""
+    rows = np.column_stack([hazards.lat, hazards.lon, hazards.level, hazards.radius])
+    rows = rows[np.lexsort(rows.T[::-1])]
+    return hashlib.blake2b(rows.tobytes(), digest_size=16).digest()
+
+
+class GraphIndex:
+    """Cached directed OSM graph together with precomputed node and edge lookup structures."""
+    
+    def __init__(self, cache_key: str, graph):
+        self.cache_key = cache_key
+        self.graph = graph
+        
+        # KD-tree over node positions on the unit sphere for nearest-node lookups
+        self.node_ids: List = list(graph.nodes)
+        node_xs = np.fromiter((graph.nodes[n]['x'] for n in self.node_ids), dtype=np.float64)
+        node_ys = np.fromiter((graph.nodes[n]['y'] for n in self.node_ids), dtype=np.float64)
+        self.node_tree = cKDTree(_unit_vectors(node_ys, node_xs))
+        
+        # (lat, lon) rows aligned with node_ids for turning routes into coordinates
+        self.node_row: Dict[Any, int] = {n: i for i, n in enumerate(self.node_ids)}
+        self.node_yx = np.column_stack([node_ys, node_xs])
+        
+        # Edge endpoints stored as parallel arrays, aligned with edge_ids
+        node_row = self.node_row
+        self.edge_ids: List[Tuple] = []
+        edge_src, edge_dst, edge_length = [], [], []
+        for u, v, key, length in graph.edges(keys=True, data='length', default=0):
+            self.edge_ids.append((u, v, key))
+            edge_src.append(node_row[u])
+            edge_dst.append(node_row[v])
+            edge_length.append(length)
+        edge_src = np.array(edge_src, dtype=np.int64)
+        edge_dst = np.array(edge_dst, dtype=np.int64)
+        edge_length = np.array(edge_length, dtype=np.float64)
+        
+        # Edge endpoints and midpoints in radians, with latitude cosines, for the hazard distance kernel
+        node_lat_rad, node_lon_rad = np.radians(node_ys), np.radians(node_xs)
+        node_cos_lat = np.cos(node_lat_rad)
+        self.edge_u_lat_rad, self.edge_u_lon_rad = node_lat_rad[edge_src], node_lon_rad[edge_src]
+        self.edge_v_lat_rad, self.edge_v_lon_rad = node_lat_rad[edge_dst], node_lon_rad[edge_dst]
+        self.edge_mid_lat_rad = (self.edge_u_lat_rad + self.edge_v_lat_rad) / 2
+        self.edge_mid_lon_rad = (self.edge_u_lon_rad + self.edge_v_lon_rad) / 2
+        self.edge_u_cos_lat = node_cos_lat[edge_src]
+        self.edge_v_cos_lat = node_cos_lat[edge_dst]
+        self.edge_mid_cos_lat = np.cos(self.edge_mid_lat_rad)
+        
+        # Unique (u, v) pairs in CSR order, keeping the shortest parallel edge.
+        # Parallel edges share endpoints, so they are always blocked together.
+        pair_key = edge_src * len(self.node_ids) + edge_dst
+        order = np.lexsort((edge_length, pair_key))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = pair_key[order][1:] != pair_key[order][:-1]
+        self.edge_pair = np.empty(len(order), dtype=np.int64)
+        self.edge_pair[order] = np.cumsum(first) - 1
+        self.pair_src = edge_src[order][first]
+        self.pair_dst = edge_dst[order][first]
+        self.pair_len = edge_length[order][first]
+        
+        # R-tree over edge segments for hazard candidate queries
+        edge_lines = shapely.linestrings(
+            np.stack([
+                np.column_stack([node_xs[edge_src], node_ys[edge_src]]),
+                np.column_stack([node_xs[edge_dst], node_ys[edge_dst]])
+            ], axis=1)
+        ) if self.edge_ids else []
+        self.edge_tree = shapely.STRtree(edge_lines)
+        
+        # Safe graphs index this graph's node rows, so they live and die with it
+        self.safe_graph_cache: LRUCache = LRUCache(maxsize=Config.SAFE_GRAPH_CACHE_SIZE)
+    
+    def route_coords(self, route: List) -> np.ndarray:
+        """Get (lat, lon) rows for the nodes of a route."""
+        node_row = self.node_row
+        return self.node_yx[[node_row[n] for n in route]]
+    
+    def great_circle_m(self, row_a: int, row_b: int) -> float:
+        """Great-circle distance in meters between two nodes, a lower bound on any path between them."""
+        chord = np.linalg.norm(self.node_tree.data[row_a] - self.node_tree.data[row_b])
+        return 2 * EARTH_RADIUS_M * math.asin(min(chord / 2, 1.0))
+    
+    def nearest_nodes(self, coords: List[Coordinate], safe_graph: "SafeGraph" = None) -> List[Any]:
+        """Find the rows of the nodes nearest to coordinates, optionally restricted to nodes with edges in ``safe_graph``."""
+        node_count = len(self.node_ids)
+        points = _unit_vectors([c.lat for c in coords], [c.lon for c in coords])
+        rows: List[Any] = [None] * len(coords)
+        pending = np.arange(len(coords))
+        k = 1
+        while pending.size and k <= node_count:
+            # One tree query for every point still without a usable node
+            _, indices = self.node_tree.query(points[pending], k=k)
+            indices = indices.reshape(pending.size, k)
+            usable = np.ones(indices.shape, dtype=bool) if safe_graph is None else safe_graph.connected[indices]
+            found = usable.any(axis=1)
+            first = usable.argmax(axis=1)
+            for p, i in zip(pending[found].tolist(), indices[found, first[found]].tolist()):
+                rows[p] = i
+            pending = pending[~found]
+            
+            if k == node_count:
+                break
+            # Nearest nodes are cut off in the graph, widen the search
+            k = min(k * 8, node_count)
+        
+        return rows
+
+
+class SafeGraph:
+    """CSR adjacency of a cached graph with dangerous edges removed."""
+    
+    def __init__(self, graph_index: GraphIndex, blocked_edges: np.ndarray):
+        node_count = len(graph_index.node_ids)
+        keep = np.ones(len(graph_index.pair_len), dtype=bool)
+        keep[graph_index.edge_pair[blocked_edges]] = False
+        
+        src = graph_index.pair_src[keep]
+        dst = graph_index.pair_dst[keep]
+        indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=node_count), out=indptr[1:])
+        self.csr = csr_matrix(
+            (graph_index.pair_len[keep], dst, indptr), shape=(node_count, node_count)
+        )
+        
+        # Nodes that still have an edge; the rest are unreachable islands
+        self.connected = np.zeros(node_count, dtype=bool)
+        self.connected[src] = True
+        self.connected[dst] = True
+
+
 class RoutingService:
     """Service class for handling routing operations."""
     
     def __init__(self):
-        self.graph_cache: Dict[str, Any] = {}
+        self.graph_cache: LRUCache = LRUCache(maxsize=Config.GRAPH_CACHE_SIZE)
+        # Routes are calculated in worker threads; cachetools caches are not thread-safe
+        self._cache_lock = threading.Lock()
+        # One lock per graph key so concurrent first requests download a graph once
+        self._load_locks: Dict[str, threading.Lock] = {}
     
-    def load_osm_graph(self, location: str, network_type: str = "drive"):
+    def load_osm_graph(self, location: str, network_type: str = "drive") -> GraphIndex:
         """Load and cache OSM graph data."""
         cache_key = f"{location}_{network_type}"
         
-        if cache_key in self.graph_cache:
-            logger.info(f"Using cached graph for {cache_key}")
-            return self.graph_cache[cache_key]
-        
-        logger.info(f"Loading OSM data for {location} ({network_type})")
-        try:
-            graph = ox.graph_from_place(location, network_type=network_type)
-            self.graph_cache[cache_key] = graph
-            return graph
-        except Exception as e:
-            logger.error(f"Failed to load OSM data: {e}")
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Failed to load map data for {location}"
-            )
+        with self._cache_lock:
+            graph_index = self.graph_cache.get(cache_key)
+            load_lock = self._load_locks.setdefault(cache_key, threading.Lock())
+        if graph_index is not None:
+            logger.info("Using cached graph for %s", cache_key)
+            return graph_index
+        
+        with load_lock:
+            # Another thread may have loaded it while we waited
+            with self._cache_lock:
+                graph_index = self.graph_cache.get(cache_key)
+            if graph_index is not None:
+                logger.info("Using cached graph for %s", cache_key)
+                return graph_index
+            
+            logger.info("Loading OSM data for %s (%s)", location, network_type)
+            try:
+                graph = ox.graph_from_place(location, network_type=network_type)
+                # Convert once at load so the cached graph and its indexes are directed
+                if not graph.is_directed():
+                    graph = graph.to_directed()
+                graph_index = GraphIndex(cache_key, graph)
+                with self._cache_lock:
+                    self.graph_cache[cache_key] = graph_index
+                return graph_index
+            except Exception as e:
+                logger.error("Failed to load OSM data: %s", e)
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Failed to load map data for {location}"
+                )
+            finally:
+                # Later requests hit the cache, so the lock is only needed while
+                # loading; leave a newer thread's lock in place
+                with self._cache_lock:
+                    if self._load_locks.get(cache_key) is load_lock:
+                        del self._load_locks[cache_key]
     
-    def identify_dangerous_edges(
+    def _dangerous_edge_levels(
         self, 
-        graph, 
-        hazards: List[HazardZone], 
-        danger_threshold: int
-    ) -> Tuple[List[Tuple], Dict[Tuple, int], Dict[str, int]]:
-        """Identify edges that fall within dangerous hazard zones."""
-        if not graph.is_directed():
-            graph = graph.to_directed()
-        
-        dangerous_edges = []
-        edge_hazard_levels = {}
-        stats = {"edges_checked": 0, "hazards_processed": 0}
-        
-        for hazard in hazards:
-            if hazard.level <= danger_threshold:
-                continue
-                
-            stats["hazards_processed"] += 1
-            hazard_point = (hazard.lat, hazard.lon)
-            
-            for u, v, key, data in graph.edges(keys=True, data=True):
-                stats["edges_checked"] += 1
-                edge_id = (u, v, key)
-                
-                # Get edge coordinates
-                u_lat, u_lon = graph.nodes[u]['y'], graph.nodes[u]['x']
-                v_lat, v_lon = graph.nodes[v]['y'], graph.nodes[v]['x']
-                
-                # Check distance to hazard
-                dist_to_u = geodesic(hazard_point, (u_lat, u_lon)).meters
-                dist_to_v = geodesic(hazard_point, (v_lat, v_lon)).meters
-                
-                mid_lat = (u_lat + v_lat) / 2
-                mid_lon = (u_lon + v_lon) / 2
-                dist_to_mid = geodesic(hazard_point, (mid_lat, mid_lon)).meters
-                
-                min_distance = min(dist_to_u, dist_to_v, dist_to_mid)
-                
-                if min_distance <= hazard.radius_m:
-                    current_level = edge_hazard_levels.get(edge_id, 0)
-                    edge_hazard_levels[edge_id] = max(current_level, hazard.level)
-                    
-                    if hazard.level > danger_threshold and edge_id not in dangerous_edges:
-                        dangerous_edges.append(edge_id)
-        
-        return dangerous_edges, edge_hazard_levels, stats
+        graph_index: GraphIndex, 
+        relevant: HazardArrays
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[str, int]]:
+        """Get indices and hazard levels of the edges inside the given blocking hazard zones."""
+        stats = {"edges_checked": 0, "hazards_processed": len(relevant)}
+        
+        if not len(relevant) or not graph_index.edge_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), stats
+        
+        # Only edges whose bounding box reaches a hazard circle can be inside it;
+        # one bulk query returns (hazard, edge) index pairs for all hazards
+        min_lon, min_lat, max_lon, max_lat = _radius_bounds(relevant.lat, relevant.lon, relevant.radius)
+        _, edge_hits = graph_index.edge_tree.query(shapely.box(min_lon, min_lat, max_lon, max_lat))
+        stats["edges_checked"] = int(edge_hits.size)
+        candidates = np.unique(edge_hits)
+        
+        # Highest level of any hazard covering each candidate edge, 0 where none does
+        hz_lat_rad = np.radians(relevant.lat)
+        levels = edge_max_hazard_levels(
+            graph_index.edge_u_lat_rad[candidates], graph_index.edge_u_lon_rad[candidates],
+            graph_index.edge_u_cos_lat[candidates],
+            graph_index.edge_v_lat_rad[candidates], graph_index.edge_v_lon_rad[candidates],
+            graph_index.edge_v_cos_lat[candidates],
+            graph_index.edge_mid_lat_rad[candidates], graph_index.edge_mid_lon_rad[candidates],
+            graph_index.edge_mid_cos_lat[candidates],
+            hz_lat_rad, np.radians(relevant.lon), np.cos(hz_lat_rad),
+            relevant.radius, relevant.level,
+            np.radians(np.column_stack([min_lat, min_lon, max_lat, max_lon]))
+        )
+        
+        hits = levels > 0
+        return candidates[hits], levels[hits], stats
     
-    def create_safe_graph(self, graph, dangerous_edges: List[Tuple]) -> Tuple[Any, int]:
-        """Create graph with dangerous edges removed."""
-        safe_graph = graph.copy()
+    def create_safe_graph(
+        self, 
+        graph_index: GraphIndex, 
+        dangerous_edges: np.ndarray
+    ) -> Tuple[SafeGraph, int]:
+        """Create a CSR graph with the given dangerous edge indices removed."""
+        return SafeGraph(graph_index, dangerous_edges), len(dangerous_edges)
+    
+    def get_safe_graph(
+        self, 
+        graph_index: GraphIndex, 
+        hazards: HazardArrays
+    ) -> Tuple[SafeGraph, int]:
+        """Get the safe graph for a set of blocking hazards, building it on a cache miss."""
+        # Keyed on the blocking hazards alone: thresholds that block the same
+        # zones share one safe graph
+        cache_key = _hazard_signature(hazards)
         
-        removed_count = 0
-        for u, v, key in dangerous_edges:
-            if safe_graph.has_edge(u, v, key):
-                safe_graph.remove_edge(u, v, key)
-                removed_count += 1
+        with self._cache_lock:
+            result = graph_index.safe_graph_cache.get(cache_key)
+        if result is not None:
+            return result
         
-        # Remove isolated nodes
-        isolated_nodes = list(nx.isolates(safe_graph))
-        safe_graph.remove_nodes_from(isolated_nodes)
+        dangerous_edges, _, _ = self._dangerous_edge_levels(graph_index, hazards)
+        result = self.create_safe_graph(graph_index, dangerous_edges)
         
-        return safe_graph, removed_count
+        with self._cache_lock:
+            graph_index.safe_graph_cache[cache_key] = result
+        
+        return result
     
     def calculate_safe_route(
         self, 
-        graph, 
+        safe_graph: SafeGraph, 
+        graph_index: GraphIndex, 
         start_coord: Coordinate, 
         end_coord: Coordinate
     ) -> Tuple[List, float]:
-        """Calculate route using A* algorithm."""
-        try:
-            start_node = ox.distance.nearest_nodes(
-                graph, X=start_coord.lon, Y=start_coord.lat
-            )
-            end_node = ox.distance.nearest_nodes(
-                graph, X=end_coord.lon, Y=end_coord.lat
-            )
-        except:
-            start_node = ox.nearest_nodes(graph, )
-            end_node = ox.nearest_nodes(graph, (end_coord.lat, end_coord.lon))
+        """Calculate the shortest safe route using Dijkstra's algorithm."""
+        start_row, end_row = graph_index.nearest_nodes([start_coord, end_coord], safe_graph)
         
-        if start_node not in graph.nodes or end_node not in graph.nodes:
+        if start_row is None or end_row is None:
             raise HTTPException(
                 status_code=400, 
                 detail="Start or end point is in a blocked area"
             )
         
-        def heuristic(u, v):
-            u_lat, u_lon = graph.nodes[u]['y'], graph.nodes[u]['x']
-            v_lat, v_lon = graph.nodes[v]['y'], graph.nodes[v]['x']
-            return geodesic((u_lat, u_lon), (v_lat, v_lon)).km
-        
-        try:
-            route = nx.astar_path(
-                graph, start_node, end_node,
-                heuristic=heuristic, weight='length'
+        # Distances within the limit are exact, so a bounded search that reaches
+        # the end node is optimal; otherwise fall back to the full search
+        limit = graph_index.great_circle_m(start_row, end_row) * Config.ROUTE_SEARCH_LIMIT_FACTOR
+        distances, predecessors = dijkstra(
+            safe_graph.csr, directed=True, indices=start_row,
+            return_predecessors=True, limit=limit
+        )
+        if np.isinf(distances[end_row]):
+            distances, predecessors = dijkstra(
+                safe_graph.csr, directed=True, indices=start_row, return_predecessors=True
             )
-            
-            # Calculate route statistics
-            total_distance = 0
-            for i in range(len(route) - 1):
-                u, v = route[i], route[i + 1]
-                if graph.has_edge(u, v):
-                    edge_data = graph[u][v][0]
-                    total_distance += edge_data.get('length', 0)
-            
-            return route, total_distance
-        
-        except nx.NetworkXNoPath:
+        if np.isinf(distances[end_row]):
             raise HTTPException(status_code=404, detail="No safe route exists")
+        
+        # Walk predecessors back from the end node
+        rows = [end_row]
+        while rows[-1] != start_row:
+            rows.append(int(predecessors[rows[-1]]))
+        rows.reverse()
+        
+        node_ids = graph_index.node_ids
+        return [node_ids[i] for i in rows], float(distances[end_row])
     
     def get_cache_stats(self) -> Dict[str, int]:
         """Get statistics about cached graphs."""
-        return {"cached_graphs": len(self.graph_cache)}
+        with self._cache_lock:
+            return {
+                "cached_graphs": len(self.graph_cache),
+                "cached_safe_graphs": sum(
+                    len(graph_index.safe_graph_cache) for graph_index in self.graph_cache.values()
+                )
+            }
 
 
 # Global instance for backward compatibility
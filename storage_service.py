@@ -9,21 +9,91 @@ with a proper database backend.
 from typing import List, Dict, Any, Optional
 import uuid
 from datetime import datetime
+import threading
+import numpy as np
+from cachetools import TTLCache
 
+from config import Config
 from models import HazardZone, RouteStats
 
 
+class HazardArrays:
+    """Immutable column-oriented set of hazard zones used on the routing hot path."""
+    
+    def __init__(
+        self,
+        lat: Optional[np.ndarray] = None,
+        lon: Optional[np.ndarray] = None,
+        radius: Optional[np.ndarray] = None,
+        level: Optional[np.ndarray] = None,
+        ids: Optional[List[Optional[str]]] = None,
+        names: Optional[List[Optional[str]]] = None
+    ):
+        self.lat = np.empty(0, dtype=np.float64) if lat is None else lat
+        self.lon = np.empty(0, dtype=np.float64) if lon is None else lon
+        self.radius = np.empty(0, dtype=np.float64) if radius is None else radius
+        self.level = np.empty(0, dtype=np.int64) if level is None else level
+        self.ids = ids or []
+        self.names = names or []
+    
+    @classmethod
+    def from_zones(cls, zones: List[HazardZone]) -> "HazardArrays":
+        """Build hazard columns from Pydantic hazard zones."""
+        return cls(
+            lat=np.array([z.lat for z in zones], dtype=np.float64),
+            lon=np.array([z.lon for z in zones], dtype=np.float64),
+            radius=np.array([z.radius_m for z in zones], dtype=np.float64),
+            level=np.array([z.level for z in zones], dtype=np.int64),
+            ids=[z.id for z in zones],
+            names=[z.name for z in zones]
+        )
+    
+    def select(self, mask: np.ndarray) -> "HazardArrays":
+        """Get the hazards where a boolean mask is set."""
+        rows = np.flatnonzero(mask).tolist()
+        return HazardArrays(
+            lat=self.lat[mask], lon=self.lon[mask],
+            radius=self.radius[mask], level=self.level[mask],
+            ids=[self.ids[i] for i in rows],
+            names=[self.names[i] for i in rows]
+        )
+    
+    def above(self, danger_threshold: int) -> "HazardArrays":
+        """Get the hazards with a level above the danger threshold."""
+        return self.select(self.level > danger_threshold)
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
 class StorageService:
     """Service class for data storage and cache management."""
     
     def __init__(self):
-        self.hazard_zones: List[HazardZone] = []
-        self.route_cache: Dict[str, Dict[str, Any]] = {}
+        # Hazard zones by ID, in insertion order
+        self.hazard_zones: Dict[str, HazardZone] = {}
+        # Column snapshot for routing, rebuilt on first read after a change;
+        # None means stale. Routing reads it from worker threads.
+        self._hazard_arrays: Optional[HazardArrays] = HazardArrays()
+        self._hazard_lock = threading.Lock()
+        self.route_cache: TTLCache = TTLCache(
+            maxsize=Config.ROUTE_CACHE_SIZE, ttl=Config.ROUTE_CACHE_TTL
+        )
+        # Routes are cached from worker threads; cachetools caches are not thread-safe
+        self._route_cache_lock = threading.Lock()
     
     # Hazard Zone Management
     def get_all_hazards(self) -> List[HazardZone]:
         """Get all current hazard zones."""
-        return self.hazard_zones
+        with self._hazard_lock:
+            return list(self.hazard_zones.values())
+    
+    def get_hazard_arrays(self) -> HazardArrays:
+        """Get all current hazard zones in column form for routing."""
+        with self._hazard_lock:
+            if self._hazard_arrays is None:
+                self._hazard_arrays = HazardArrays.from_zones(list(self.hazard_zones.values()))
+            return self._hazard_arrays
     
     def add_hazard(self, hazard: HazardZone) -> HazardZone:
         """Add a new hazard zone."""
@@ -31,17 +101,21 @@ class StorageService:
             hazard.id = str(uuid.uuid4())
         hazard.created_at = datetime.now()
         
-        # Remove existing hazard with same ID
-        self.hazard_zones = [h for h in self.hazard_zones if h.id != hazard.id]
-        self.hazard_zones.append(hazard)
+        # Replace existing hazard with same ID, moving it to the end
+        with self._hazard_lock:
+            self.hazard_zones.pop(hazard.id, None)
+            self.hazard_zones[hazard.id] = hazard
+            self._hazard_arrays = None
         
         return hazard
     
     def delete_hazard(self, hazard_id: str) -> bool:
         """Delete a hazard zone by ID. Returns True if deleted, False if not found."""
-        original_count = len(self.hazard_zones)
-        self.hazard_zones = [h for h in self.hazard_zones if h.id != hazard_id]
-        return len(self.hazard_zones) != original_count
+        with self._hazard_lock:
+            if self.hazard_zones.pop(hazard_id, None) is None:
+                return False
+            self._hazard_arrays = None
+            return True
     
     def initialize_default_hazards(self) -> None:
         """Initialize storage with default hazard zones."""
@@ -72,7 +146,10 @@ class StorageService:
             )
         ]
         
-        self.hazard_zones.extend(default_hazards)
+        with self._hazard_lock:
+            for hazard in default_hazards:
+                self.hazard_zones[hazard.id] = hazard
+            self._hazard_arrays = None
     
     # Route Cache Management
     def cache_route(
@@ -81,16 +158,13 @@ class StorageService:
         route_data: Dict[str, Any]
     ) -> None:
         """Cache route calculation results."""
-        self.route_cache[route_id] = route_data
+        with self._route_cache_lock:
+            self.route_cache[route_id] = route_data
     
     def get_cached_route(self, route_id: str) -> Optional[Dict[str, Any]]:
         """Get cached route data by ID."""
-        return self.route_cache.get(route_id)
-    
-    def get_route_map_html(self, route_id: str) -> Optional[str]:
-        """Get cached route map HTML."""
-        route_data = self.get_cached_route(route_id)
-        return route_data["map_html"] if route_data else None
+        with self._route_cache_lock:
+            return self.route_cache.get(route_id)
     
     def get_route_stats(self, route_id: str) -> Optional[RouteStats]:
         """Get cached route statistics."""
@@ -100,9 +174,11 @@ class StorageService:
     # Statistics
     def get_storage_stats(self) -> Dict[str, int]:
         """Get storage statistics."""
+        with self._route_cache_lock:
+            cached_routes = len(self.route_cache)
         return {
             "hazard_zones": len(self.hazard_zones),
-            "cached_routes": len(self.route_cache)
+            "cached_routes": cached_routes
         }
 
 
@@ -0,0 +1,87 @@
+"""
+Reference checks for the compiled hazard distance kernel.
+
+The kernel prunes by bounding box and visits hazards by level, so these
+tests compare it against a plain NumPy haversine over every edge and hazard.
+"""
+
+import unittest
+import numpy as np
+
+from hazard_kernels import EARTH_RADIUS_M, edge_max_hazard_levels
+from routing_service import _radius_bounds
+
+
+def _haversine_m(lat1, lon1, lat2, lon2):
+    """Haversine distance in meters between points given in radians."""
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def _reference_levels(u_lat, u_lon, v_lat, v_lon, hz_lat, hz_lon, hz_radius, hz_level):
+    """Highest covering hazard level per edge, computed without any pruning."""
+    m_lat, m_lon = (u_lat + v_lat) / 2, (u_lon + v_lon) / 2
+    levels = np.zeros(u_lat.shape[0], dtype=np.int64)
+    for j in range(hz_lat.shape[0]):
+        distance = np.minimum.reduce([
+            _haversine_m(hz_lat[j], hz_lon[j], u_lat, u_lon),
+            _haversine_m(hz_lat[j], hz_lon[j], v_lat, v_lon),
+            _haversine_m(hz_lat[j], hz_lon[j], m_lat, m_lon)
+        ])
+        levels = np.where(distance <= hz_radius[j], np.maximum(levels, hz_level[j]), levels)
+    return levels
+
+
+def _kernel_levels(u_lat, u_lon, v_lat, v_lon, hz_lat, hz_lon, hz_radius, hz_level):
+    """Run the kernel with the same inputs and hazard boxes that routing passes it."""
+    u_lat, u_lon, v_lat, v_lon = map(np.radians, (u_lat, u_lon, v_lat, v_lon))
+    m_lat, m_lon = (u_lat + v_lat) / 2, (u_lon + v_lon) / 2
+    min_lon, min_lat, max_lon, max_lat = _radius_bounds(hz_lat, hz_lon, hz_radius)
+    hz_lat_rad = np.radians(hz_lat)
+    return edge_max_hazard_levels(
+        u_lat, u_lon, np.cos(u_lat), v_lat, v_lon, np.cos(v_lat), m_lat, m_lon, np.cos(m_lat),
+        hz_lat_rad, np.radians(hz_lon), np.cos(hz_lat_rad), hz_radius, hz_level,
+        np.radians(np.column_stack([min_lat, min_lon, max_lat, max_lon]))
+    )
+
+
+class EdgeMaxHazardLevelsTest(unittest.TestCase):
+    """The kernel must agree with an unpruned haversine scan."""
+    
+    def _check(self, seed, center_lat, center_lon, span, edges, hazards):
+        rng = np.random.default_rng(seed)
+        u_lat = center_lat + rng.random(edges) * span
+        u_lon = center_lon + rng.random(edges) * span
+        # Short segments, like street edges
+        v_lat = u_lat + rng.normal(0, 0.002, edges)
+        v_lon = u_lon + rng.normal(0, 0.002, edges)
+        hz_lat = center_lat + rng.random(hazards) * span
+        hz_lon = center_lon + rng.random(hazards) * span
+        hz_radius = 10 + rng.random(hazards) * 990
+        hz_level = rng.integers(1, 11, hazards).astype(np.int64)
+        
+        expected = _reference_levels(
+            *map(np.radians, (u_lat, u_lon, v_lat, v_lon, hz_lat, hz_lon)), hz_radius, hz_level
+        )
+        actual = _kernel_levels(u_lat, u_lon, v_lat, v_lon, hz_lat, hz_lon, hz_radius, hz_level)
+        
+        self.assertTrue(np.any(expected > 0))
+        np.testing.assert_array_equal(actual, expected)
+    
+    def test_matches_reference_at_city_scale(self):
+        self._check(0, 18.78, 98.97, 0.05, 5000, 40)
+    
+    def test_matches_reference_at_high_latitude(self):
+        self._check(1, 69.6, 18.9, 0.05, 5000, 40)
+    
+    def test_no_hazards(self):
+        edges = np.array([18.78, 18.79])
+        levels = _kernel_levels(
+            edges, edges, edges, edges,
+            np.empty(0), np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+        )
+        np.testing.assert_array_equal(levels, [0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
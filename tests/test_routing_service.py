@@ -0,0 +1,130 @@
+"""
+Reference checks for hazard detection and CSR routing in RoutingService.
+
+Graphs are built in memory, so no OSM download is needed. Results are
+compared against a brute-force hazard scan and networkx shortest paths.
+"""
+
+import unittest
+import networkx as nx
+import numpy as np
+
+from models import Coordinate
+from routing_service import GraphIndex, RoutingService
+from storage_service import HazardArrays
+from tests.test_hazard_kernels import _reference_levels, _haversine_m
+
+
+def _grid_graph(seed: int, size: int = 25, spacing: float = 0.001) -> nx.MultiDiGraph:
+    """Street-like grid with two-way streets, missing edges and parallel edges."""
+    rng = np.random.default_rng(seed)
+    graph = nx.MultiDiGraph()
+    for i in range(size):
+        for j in range(size):
+            graph.add_node(
+                i * size + j,
+                y=18.78 + i * spacing + rng.normal(0, spacing / 10),
+                x=98.97 + j * spacing + rng.normal(0, spacing / 10)
+            )
+    
+    def add(u, v):
+        straight = float(_haversine_m(*np.radians([
+            graph.nodes[u]['y'], graph.nodes[u]['x'], graph.nodes[v]['y'], graph.nodes[v]['x']
+        ])))
+        graph.add_edge(u, v, length=straight * (1 + rng.random() * 0.5))
+    
+    for i in range(size):
+        for j in range(size):
+            n = i * size + j
+            for m in ([n + 1] if j + 1 < size else []) + ([n + size] if i + 1 < size else []):
+                if rng.random() < 0.1:
+                    continue
+                add(n, m)
+                if rng.random() < 0.8:
+                    add(m, n)
+                if rng.random() < 0.05:
+                    add(n, m)
+    return graph
+
+
+def _random_hazards(seed: int, count: int) -> HazardArrays:
+    rng = np.random.default_rng(seed)
+    return HazardArrays(
+        lat=18.78 + rng.random(count) * 0.024,
+        lon=98.97 + rng.random(count) * 0.024,
+        radius=50 + rng.random(count) * 200,
+        level=rng.integers(1, 11, count).astype(np.int64),
+        ids=[f"hazard-{i}" for i in range(count)],
+        names=[f"Hazard {i}" for i in range(count)]
+    )
+
+
+class HazardDetectionTest(unittest.TestCase):
+    """STRtree candidates plus the kernel must find exactly the covered edges."""
+    
+    def test_matches_reference_scan(self):
+        graph_index = GraphIndex("grid", _grid_graph(0))
+        hazards = _random_hazards(1, 12)
+        
+        edge_idx, levels, _ = RoutingService()._dangerous_edge_levels(graph_index, hazards)
+        
+        src = np.array([graph_index.node_row[u] for u, _, _ in graph_index.edge_ids])
+        dst = np.array([graph_index.node_row[v] for _, v, _ in graph_index.edge_ids])
+        lat, lon = np.radians(graph_index.node_yx[:, 0]), np.radians(graph_index.node_yx[:, 1])
+        expected = _reference_levels(
+            lat[src], lon[src], lat[dst], lon[dst],
+            np.radians(hazards.lat), np.radians(hazards.lon), hazards.radius, hazards.level
+        )
+        
+        actual = np.zeros(len(graph_index.edge_ids), dtype=np.int64)
+        actual[edge_idx] = levels
+        self.assertTrue(np.any(expected > 0))
+        np.testing.assert_array_equal(actual, expected)
+
+
+class SafeRouteTest(unittest.TestCase):
+    """Routes must match networkx shortest paths on the graph minus blocked edges."""
+    
+    def test_matches_networkx_shortest_path(self):
+        service = RoutingService()
+        graph = _grid_graph(2)
+        graph_index = GraphIndex("grid", graph)
+        hazards = _random_hazards(3, 10)
+        safe_graph, _ = service.get_safe_graph(graph_index, hazards)
+        
+        # Parallel edges share endpoints, so a blocked edge blocks its (u, v) pair
+        edge_idx, _, _ = service._dangerous_edge_levels(graph_index, hazards)
+        blocked = {graph_index.edge_ids[i][:2] for i in edge_idx}
+        reference = nx.DiGraph()
+        for u, v, length in graph.edges(data='length'):
+            if (u, v) in blocked:
+                continue
+            if not reference.has_edge(u, v) or reference[u][v]['length'] > length:
+                reference.add_edge(u, v, length=length)
+        
+        rng = np.random.default_rng(4)
+        checked = 0
+        for _ in range(40):
+            start = Coordinate(lat=18.78 + rng.random() * 0.024, lon=98.97 + rng.random() * 0.024)
+            end = Coordinate(lat=18.78 + rng.random() * 0.024, lon=98.97 + rng.random() * 0.024)
+            start_row, end_row = graph_index.nearest_nodes([start, end], safe_graph)
+            source, target = graph_index.node_ids[start_row], graph_index.node_ids[end_row]
+            if not nx.has_path(reference, source, target):
+                continue
+            
+            route, distance = service.calculate_safe_route(safe_graph, graph_index, start, end)
+            
+            self.assertAlmostEqual(
+                distance, nx.shortest_path_length(reference, source, target, weight='length'), places=6
+            )
+            self.assertEqual((route[0], route[-1]), (source, target))
+            self.assertAlmostEqual(
+                sum(reference[u][v]['length'] for u, v in zip(route, route[1:])), distance, places=6
+            )
+            checked += 1
+        
+        self.assertGreater(checked, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()